@@ -0,0 +1,296 @@
+import os
+import json
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+from edo_graphs2 import necklace_tables, necklace_count, canonical_rotations, popcounts, \
+    build_interval_graph, interval_offsets, mask_to_binary, canonical_lookup, CANONICAL_LOOKUPS
+
+# shape tables are stored once per (edo, size) as .npy arrays of chord masks, so
+# they can be memory mapped instead of regenerated. bump CACHE_VERSION whenever
+# the layout or the ordering of a table changes, old versions are then ignored.
+CACHE_VERSION = 1
+CACHE_DIR = 'cache'
+SELECTION_FILE = os.path.join(CACHE_DIR, 'selection.json')
+# changes made since SELECTION_FILE was written, one "row size index state" line each
+SELECTION_LOG = os.path.join(CACHE_DIR, 'selection.log')
+# shape tables kept in memory by (edo, size) across edo switches, up to this many bytes
+SHAPE_CACHE_BYTES = 64 << 20
+SHAPE_CACHE = OrderedDict()
+# processes used to build missing shape tables, None uses every core
+WORKERS = None
+# edos up to this get a lookup table of the canonical form of every chord
+LOOKUP_MAX_EDO = 24
+# chords handled at a time while building a lookup table
+LOOKUP_CHUNK = 1 << 20
+# held while a missing table is built, the ui and the loader thread may both ask for it
+BUILD_LOCK = threading.RLock()
+
+def mask_dtype(edo):
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if edo <= np.iinfo(dtype).bits:
+            return dtype
+    raise ValueError("edo too large for a packed mask table")
+
+def shape_table_path(edo, size):
+    return os.path.join(CACHE_DIR, f'v{CACHE_VERSION}', f'edo{edo}', f'shapes{size}.npy')
+
+def save_array(path, array):
+    # write next to the target and rename, so a crash never leaves half a table
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, array)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+def cached_shape_table(edo, size):
+    try:
+        table = np.load(shape_table_path(edo, size), mmap_mode='r')
+        if table.dtype == mask_dtype(edo) and len(table) == necklace_count(edo, size):
+            return table
+    except (OSError, ValueError):
+        pass
+    return None
+
+def load_shape_table(edo, size):
+    return load_shape_tables(edo, [size])[0]
+
+def load_shape_tables(edo, sizes=None, workers=None):
+    # missing tables are built together so they can share the process pool
+    sizes = list(range(edo+1) if sizes is None else sizes)
+    tables = {size: cached_shape_table(edo, size) for size in sizes}
+    if any(table is None for table in tables.values()):
+        with BUILD_LOCK:
+            # another thread may have built them while this one waited
+            missing = [size for size in sizes if tables[size] is None and cached_shape_table(edo, size) is None]
+            for size, table in zip(missing, necklace_tables(edo, missing, workers or WORKERS)):
+                save_array(shape_table_path(edo, size), table.astype(mask_dtype(edo)))
+            tables = {size: tables[size] if tables[size] is not None else cached_shape_table(edo, size) for size in sizes}
+    return [tables[size] for size in sizes]
+
+def cached_shapes(edo, size):
+    # the in-memory table of (edo, size), None if it isn't in SHAPE_CACHE
+    table = SHAPE_CACHE.get((edo, size))
+    if table is not None:
+        SHAPE_CACHE.move_to_end((edo, size))
+    return table
+
+def remember_shapes(edo, size, table):
+    # copies the table into SHAPE_CACHE, the least recently used tables go first
+    SHAPE_CACHE[(edo, size)] = np.array(table)
+    SHAPE_CACHE.move_to_end((edo, size))
+    total = sum(table.nbytes for table in SHAPE_CACHE.values())
+    while total > SHAPE_CACHE_BYTES and len(SHAPE_CACHE) > 1:
+        total -= SHAPE_CACHE.popitem(last=False)[1].nbytes
+    return SHAPE_CACHE.get((edo, size))
+
+def shape_table(edo, size):
+    # the shapes of (edo, size) from SHAPE_CACHE, otherwise mapped from the disk cache
+    table = cached_shapes(edo, size)
+    return load_shape_table(edo, size) if table is None else table
+
+def lookup_paths(edo):
+    directory = os.path.dirname(shape_table_path(edo, 0))
+    return [os.path.join(directory, name + '.npy') for name in ('canonical', 'steps', 'ranks')]
+
+def build_canonical_lookup(edo):
+    # for every chord: its smallest rotation, the rotation step (as in
+    # canonical_rotations) and the index of its shape in the shape table of its size
+    tables = load_shape_tables(edo)
+    canonical = np.empty(1 << edo, dtype=mask_dtype(edo))
+    steps = np.empty(1 << edo, dtype=np.uint8)
+    ranks = np.empty(1 << edo, dtype=np.uint32)
+    for start in range(0, 1 << edo, LOOKUP_CHUNK):
+        chords = np.arange(start, min(start + LOOKUP_CHUNK, 1 << edo), dtype=np.uint64)
+        smallest, rotation_steps = canonical_rotations(chords, edo, use_lookup=False)
+        sizes = popcounts(smallest)
+        chunk_ranks = np.empty(len(chords), dtype=np.uint32)
+        for size in np.unique(sizes).tolist():
+            same_size = sizes == size
+            chunk_ranks[same_size] = np.searchsorted(tables[size], smallest[same_size].astype(tables[size].dtype))
+        canonical[start:start+len(chords)] = smallest
+        steps[start:start+len(chords)] = rotation_steps
+        ranks[start:start+len(chords)] = chunk_ranks
+    for path, array in zip(lookup_paths(edo), (canonical, steps, ranks)):
+        save_array(path, array)
+
+def load_canonical_lookup(edo):
+    # (canonical, steps, ranks) memory mapped and indexed by chord, None for large
+    # edos and for tables that haven't been built yet (see prepare_canonical_lookup)
+    if edo > LOOKUP_MAX_EDO:
+        return None
+    try:
+        arrays = [np.load(path, mmap_mode='r') for path in lookup_paths(edo)]
+        if all(len(array) == 1 << edo for array in arrays):
+            return tuple(arrays)
+    except (OSError, ValueError):
+        pass
+    return None
+
+def prepare_canonical_lookup(edo):
+    # builds the lookup of edo if it's missing, the one step that writes it.
+    # takes seconds and over 100MB at edo 24, so it's only done when asked for
+    if edo > LOOKUP_MAX_EDO:
+        return None
+    with BUILD_LOCK:
+        # another thread may have built it while this one waited
+        if load_canonical_lookup(edo) is None:
+            build_canonical_lookup(edo)
+    CANONICAL_LOOKUPS.pop(edo, None)
+    return canonical_lookup(edo)
+
+def interval_graph_paths(edo, size, offsets):
+    directory = os.path.join(os.path.dirname(shape_table_path(edo, 0)), 'intervals_' + '_'.join(map(str, offsets)))
+    return [os.path.join(directory, f'{name}{size}.npy') for name in ('indptr', 'neighbors', 'shifts')]
+
+def cached_interval_graph(shapes, paths):
+    try:
+        arrays = [np.load(path, mmap_mode='r') for path in paths]
+        if len(arrays[0]) == len(shapes) + 1 and len(arrays[1]) == len(arrays[2]) == arrays[0][-1]:
+            return (shapes, *arrays)
+    except (OSError, ValueError):
+        pass
+    return None
+
+def load_interval_graph(edo, size, offsets):
+    # (shapes, indptr, neighbors, shifts) of the voice leading graph, see build_interval_graph
+    shapes = load_shape_table(edo, size)
+    paths = interval_graph_paths(edo, size, offsets)
+    graph = cached_interval_graph(shapes, paths)
+    if graph is None:
+        with BUILD_LOCK:
+            graph = cached_interval_graph(shapes, paths)
+            if graph is None:
+                for path, array in zip(paths, build_interval_graph(shapes, edo, offsets)):
+                    save_array(path, array)
+                graph = cached_interval_graph(shapes, paths)
+    return graph
+
+def export_interval_graph(path, edo, intervals, both_directions=True, chord_sizes=None):
+    # writes the voice leading graph between shapes as graphml, a size at a time.
+    # nodes are the shapes (with their binary), edges carry the rotation shift.
+    offsets = interval_offsets(edo, intervals, both_directions)
+    chord_sizes = range(edo+1) if chord_sizes is None else chord_sizes
+    with open(path, 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+                '  <key id="binary" for="node" attr.name="binary" attr.type="string"/>\n'
+                '  <key id="size" for="node" attr.name="size" attr.type="int"/>\n'
+                '  <key id="shift" for="edge" attr.name="shift" attr.type="int"/>\n'
+                f'  <graph id="edo{edo}" edgedefault="directed">\n')
+        for size in chord_sizes:
+            shapes, indptr, neighbors, shifts = load_interval_graph(edo, size, offsets)
+            for i, shape in enumerate(shapes.tolist()):
+                f.write(f'    <node id="s{size}_{i}"><data key="binary">{mask_to_binary(shape, edo)}</data>'
+                        f'<data key="size">{size}</data></node>\n')
+            for i in range(len(shapes)):
+                start, stop = int(indptr[i]), int(indptr[i+1])
+                for j, shift in zip(neighbors[start:stop].tolist(), shifts[start:stop].tolist()):
+                    f.write(f'    <edge source="s{size}_{i}" target="s{size}_{j}"><data key="shift">{shift}</data></edge>\n')
+        f.write('  </graph>\n</graphml>\n')
+
+class SelectionBits:
+    # the selected shapes of one size as a packed bitset, with a running count so
+    # "is anything selected" doesn't need a scan
+    def __init__(self, length):
+        self.length = length
+        self.bits = np.zeros((length + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        # an int gives a bool, a slice a bool array
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            first = start // 8
+            unpacked = np.unpackbits(self.bits[first:(stop + 7) // 8], bitorder='little').astype(bool)
+            return unpacked[start - first * 8:stop - first * 8:step]
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+        return bool(self.bits[index >> 3] >> (index & 7) & 1)
+
+    def __setitem__(self, index, state):
+        if self[index] != bool(state):
+            self.bits[index >> 3] ^= np.uint8(1 << (index & 7))
+            self.count += 1 if state else -1
+
+    def selected(self):
+        # indices of the selected shapes, in order
+        return np.flatnonzero(np.unpackbits(self.bits, count=self.length, bitorder='little'))
+
+    def copy(self):
+        copy = SelectionBits(self.length)
+        copy.bits[:], copy.count = self.bits, self.count
+        return copy
+
+def empty_selection(edo):
+    return [SelectionBits(necklace_count(edo, size)) for size in range(edo+1)]
+
+def save_selection(edo, chord_states1, chord_states2):
+    # only the selected indices are stored, per size
+    selection = {
+        "version": CACHE_VERSION,
+        "edo": edo,
+        "states1": [states.selected().tolist() for states in chord_states1],
+        "states2": [states.selected().tolist() for states in chord_states2],
+    }
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    temp_path = SELECTION_FILE + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(selection, f)
+    os.replace(temp_path, SELECTION_FILE)
+    # the log starts over, its first line names the edo it belongs to
+    with open(SELECTION_LOG, 'w') as f:
+        f.write(f"{CACHE_VERSION} {edo}\n")
+
+def append_selection_changes(edo, changes):
+    # changes are (row, size, index, state), row 1 is chord_states1 and 4 chord_states2
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(SELECTION_LOG, 'a') as f:
+        if f.tell() == 0:
+            f.write(f"{CACHE_VERSION} {edo}\n")
+        f.write(''.join(f"{row} {size} {index} {int(state)}\n" for row, size, index, state in changes))
+        f.flush()
+        os.fsync(f.fileno())
+
+def replay_selection_log(edo, chord_states1, chord_states2):
+    try:
+        with open(SELECTION_LOG) as f:
+            lines = f.read().split('\n')
+    except OSError:
+        return
+    if lines[0].split() != [str(CACHE_VERSION), str(edo)]:
+        return
+    for line in lines[1:]:
+        try:
+            row, size, index, state = map(int, line.split())
+        except ValueError:
+            # a line cut short by a crash
+            continue
+        states = chord_states1 if row == 1 else chord_states2
+        if size < len(states) and index < len(states[size]):
+            states[size][index] = bool(state)
+
+def load_selection(edo):
+    chord_states1, chord_states2 = empty_selection(edo), empty_selection(edo)
+    try:
+        with open(SELECTION_FILE) as f:
+            selection = json.load(f)
+    except (OSError, ValueError):
+        return chord_states1, chord_states2
+    if selection.get("version") != CACHE_VERSION or selection.get("edo") != edo:
+        return chord_states1, chord_states2
+    for chord_states, selected in ((chord_states1, selection["states1"]), (chord_states2, selection["states2"])):
+        for states, indices in zip(chord_states, selected):
+            for i in indices:
+                if i < len(states):
+                    states[i] = True
+    replay_selection_log(edo, chord_states1, chord_states2)
+    return chord_states1, chord_states2
@@ -0,0 +1,58 @@
+import os
+import struct
+import numpy as np
+from edo_graphs2 import symbol_columns, STREAM_CHUNK
+from chord_cache import mask_dtype
+
+# a results file is a fixed size header followed by every chord as a packed mask
+# (the smallest unsigned type that fits the edo). symbols are only made from the
+# masks for the rows that get shown or exported.
+RESULTS_FILE = 'results.chords'
+RESULTS_MAGIC = b'EDOCHRDS'
+RESULTS_VERSION = 1
+# magic, version, edo, style, count
+HEADER_FORMAT = '<8sHH16sQ'
+HEADER_SIZE = 64
+
+def write_results(path, edo, chunks, style='actual'):
+    # chunks is any iterable of mask arrays, the count is filled in at the end
+    dtype = mask_dtype(edo)
+    temp_path = path + '.tmp'
+    count = 0
+    with open(temp_path, 'wb') as f:
+        f.write(bytes(HEADER_SIZE))
+        for chunk in chunks:
+            chunk = np.asarray(chunk).astype(np.dtype(dtype).newbyteorder('<'))
+            f.write(chunk.tobytes())
+            count += len(chunk)
+        f.seek(0)
+        f.write(struct.pack(HEADER_FORMAT, RESULTS_MAGIC, RESULTS_VERSION, edo, style.encode(), count))
+    os.replace(temp_path, path)
+    return count
+
+def read_results(path):
+    # (edo, style, masks) with the masks memory mapped
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE:
+        raise ValueError(f"{path} is not a results file")
+    magic, version, edo, style, count = struct.unpack_from(HEADER_FORMAT, header)
+    if magic != RESULTS_MAGIC or version != RESULTS_VERSION:
+        raise ValueError(f"{path} is not a results file")
+    style = style.rstrip(b'\0').decode()
+    dtype = np.dtype(mask_dtype(edo)).newbyteorder('<')
+    if count == 0:
+        return edo, style, np.zeros(0, dtype=dtype)
+    return edo, style, np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(count,))
+
+def result_symbols(masks, edo, start=0, stop=None, style='actual'):
+    # the symbols of masks[start:stop] only, in file order
+    return symbol_columns(masks[start:stop], edo, (style,))[style]
+
+def export_symbols(path, text_path, style=None):
+    # writes the symbols of a results file one per line, a chunk at a time
+    edo, saved_style, masks = read_results(path)
+    with open(text_path, 'w') as f:
+        for start in range(0, len(masks), STREAM_CHUNK):
+            for symbol in result_symbols(masks, edo, start, start + STREAM_CHUNK, style or saved_style):
+                f.write(symbol + '\n')
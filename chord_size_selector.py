@@ -1,8 +1,13 @@
 import pygame
 import os
-import importlib
-from itertools import combinations
-from edo_graphs2 import smallest_rotation
+import queue
+import threading
+from collections import OrderedDict
+import numpy as np
+from edo_graphs2 import necklace_count, generate_chords, ordering_permutation, ORDERINGS
+from chord_cache import load_shape_table, cached_shapes, remember_shapes, load_selection, save_selection, \
+    append_selection_changes
+from chord_results import RESULTS_FILE, write_results
 
 BLACK = (0, 0, 0)
 DARKEST_GRAY = (20, 20, 20)
@@ -22,6 +27,16 @@ SELECTED_BG = (50, 50, 0)
 SLIDER_COLOR = (230, 217, 217)
 
 GENERATE_Y_OFFSET = 0
+# the chord list is drawn in tiles of this many rows, and this many tiles are kept
+TILE_ROWS = 64
+TILE_CACHE_SIZE = 48
+# selection toggles are written once none came for this many seconds, or this many piled up
+SELECTION_FLUSH_DELAY = 0.5
+SELECTION_FLUSH_MAX = 64
+# palette of the chord list tiles: background, selected background, chord bit,
+# selected chord bit, grid line
+TILE_PALETTE = [BLACK, SELECTED_BG, VERY_LIGHT_GRAY, BLUE, MEDIUM_DARK_GRAY]
+CELL, LINE = 2, 4
 
 
 CHARACTERS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
@@ -30,13 +45,67 @@ CHAR_TO_VALUE = {char: index for index, char in enumerate(CHARACTERS)}
 def base62_to_int(b62_str):
     return sum(CHAR_TO_VALUE[char] * (62 ** i) for i, char in enumerate(reversed(b62_str)))
 
-def generate_chord_sizes(edo):
-    chord_sizes = [sorted({smallest_rotation(format(sum(1 << i for i in comb), f'0{edo}b'))[0][::-1] 
-            for comb in combinations(range(edo), s)}, key=lambda x: int(x[::-1], 2)) 
-            for s in range(edo+1)]
-    chord_states1 = [[False for _ in chord_set] for chord_set in chord_sizes]
-    chord_states2 = [[False for _ in chord_set] for chord_set in chord_sizes]
-    return chord_sizes, chord_states1, chord_states2
+def generate_chord_sizes(edo, request):
+    # the selection of the edo comes from load_selection
+    return ShapeSizes(edo, request)
+
+def load_shapes(requests, loaded, current):
+    # runs on a background thread: loads the (edo, size) tables asked for on requests
+    # and puts (edo, size, table) on loaded. requests for an edo other than
+    # current["edo"] are dropped, so switching edo cancels what is still queued.
+    while True:
+        edo, size = requests.get()
+        if edo != current["edo"]:
+            continue
+        try:
+            table = load_shape_table(edo, size)
+        except Exception as error:
+            table = error
+        loaded.put((edo, size, table))
+
+def write_selection(changes):
+    # runs on a background thread: writes what the selector puts on changes, in order.
+    # ("toggle", edo, row, size, index, state) items are gathered and appended to the
+    # selection log together, ("snapshot", edo, chord_states1, chord_states2) rewrites
+    # the selection file and starts the log over, ("flush",) writes what is gathered now.
+    while True:
+        batch = [changes.get()]
+        while batch[-1][0] == "toggle" and len(batch) < SELECTION_FLUSH_MAX:
+            try:
+                batch.append(changes.get(timeout=SELECTION_FLUSH_DELAY))
+            except queue.Empty:
+                break
+        try:
+            toggles = [item[2:] for item in batch if item[0] == "toggle"]
+            if toggles:
+                append_selection_changes(batch[0][1], toggles)
+            if batch[-1][0] == "snapshot":
+                save_selection(*batch[-1][1:])
+        except Exception as error:
+            print(f"Error: Could not save the selection: {error}")
+        finally:
+            for item in batch:
+                changes.task_done()
+
+class ShapeSizes:
+    # chord_sizes of one edo, indexed by size. a size comes from the shape cache, or
+    # is None the first time while request has the loader thread fetch it. sizes
+    # that failed to load stay None and aren't asked for again
+    def __init__(self, edo, request):
+        self.edo = edo
+        self.request = request
+        self.pending = set()
+        self.failed = set()
+
+    def __len__(self):
+        return self.edo + 1
+
+    def __getitem__(self, size):
+        table = cached_shapes(self.edo, size)
+        if table is None and size not in self.pending and size not in self.failed:
+            self.pending.add(size)
+            self.request(self.edo, size)
+        return table
 
 class ChordSizeSelector:
     def __init__(self):
@@ -51,7 +120,6 @@ class ChordSizeSelector:
         self.create_print_button()
         self.setup_state()
         self.generate_and_save_chord_sizes()
-        self.load_chord_sizes()
         self.scroll_offset = 0
         self.max_scroll_offset = 0 
         self.old_button_index = 0
@@ -76,9 +144,24 @@ class ChordSizeSelector:
         self.dragging = False
         self.drag_start = self.drag_end = self.active_region = self.mouse_down_pos = None
         self.symbols = self.chord_sizes = self.chord_states1 = self.chord_states2 = []
+        # display order of the generated chords. the result in every ordering already
+        # used is kept by ordering name until the next generate
+        self.ordering = 'binary'
+        self.orderings = {}
         self.pending_edo_update = None
         self.slider_positions = {1: None, 4: None}
         self.dragging_slider = None
+        self.tile_cache = OrderedDict()
+        # what each part of the window last showed, see draw
+        self.drawn = {}
+        self.glyphs = {}
+        # one loader thread for the whole session, see load_shapes
+        requests, loaded, current = queue.Queue(), queue.Queue(), {"edo": None}
+        thread = threading.Thread(target=load_shapes, args=(requests, loaded, current), daemon=True)
+        self.shape_loader = {"requests": requests, "loaded": loaded, "current": current, "thread": thread}
+        thread.start()
+        self.selection_writer = queue.Queue()
+        threading.Thread(target=write_selection, args=(self.selection_writer,), daemon=True).start()
 
     def create_selector_panel(self):
         self.selector_panel = {"buttons": list(CHARACTERS[:len(CHARACTERS)//3]), "rects": [], "selected": 12}
@@ -141,60 +224,128 @@ class ChordSizeSelector:
                                                    self.CHAR_WIDTH, self.selector_height) for i in range(len(self.selector_panel["buttons"]))]
 
     def draw(self):
-        self.screen.fill(VERY_DARK_GRAY)
-        pygame.draw.rect(self.screen, DARKEST_GRAY, pygame.Rect(0, 0, self.left_region_width, self.height))
-        
-        self.draw_persistent_binaries()
-
-        for region in self.regions:
-            self.draw_region(region)
-
-        pygame.draw.rect(self.screen, DARKER_GRAY, self.print_button["rect"])
-        print_text = self.print_button_font.render(self.print_button["label"], True, LIGHTEST_GRAY)
-        self.screen.blit(print_text, self.print_button["rect"].topleft)
-
-        pygame.display.flip()
-
-    def draw_persistent_binaries(self):
+        # retained mode: each part of the window is only redrawn, and pushed to the
+        # display, when what it shows differs from what self.drawn says it showed
+        full = not self.drawn
+        if full:
+            self.screen.fill(VERY_DARK_GRAY)
+        dirty = []
+
+        pane = pygame.Rect(0, 0, self.left_region_width, self.height)
+        shown = self.persistent_binaries()
+        pane_key = self.binaries_key(*shown) if shown else None
+        if self.drawn.get("binaries", False) != pane_key:
+            self.drawn["binaries"] = pane_key
+            pygame.draw.rect(self.screen, DARKEST_GRAY, pane)
+            if shown:
+                self.draw_binaries(*shown)
+            dirty.append(pane)
+
+        for i, region in enumerate(self.regions):
+            look = self.region_look(region)
+            if self.drawn.get(i) != look:
+                self.drawn[i] = look
+                area = self.region_area(region)
+                pygame.draw.rect(self.screen, VERY_DARK_GRAY, area)
+                self.draw_region(region, look)
+                dirty.append(area)
+
+        if "print" not in self.drawn:
+            self.drawn["print"] = True
+            pygame.draw.rect(self.screen, DARKER_GRAY, self.print_button["rect"])
+            print_text = self.render_text(self.print_button_font, self.print_button["label"], LIGHTEST_GRAY)
+            self.screen.blit(print_text, self.print_button["rect"].topleft)
+            dirty.append(self.print_button["rect"])
+
+        if full:
+            pygame.display.flip()
+        elif dirty:
+            pygame.display.update(dirty)
+
+    def render_text(self, font, text, color):
+        key = (font, text, color)
+        if key not in self.glyphs:
+            self.glyphs[key] = font.render(text, True, color)
+        return self.glyphs[key]
+
+    def persistent_binaries(self):
+        # (binaries, states, edo) of the list in the left pane, None when it's empty
         edo = base62_to_int(self.regions[0]["buttons"][self.selector_panel["selected"]])
         for row in [1, 4]:
             if self.slider_positions[row] is not None:
                 button_index = self.slider_positions[row]
                 chord_states = self.chord_states1 if row == 1 else self.chord_states2
-                self.draw_binaries(self.chord_sizes[button_index], chord_states[button_index], edo)
-                return  # Only draw for the first active slider
+                if self.chord_sizes[button_index] is None:
+                    return None  # still loading
+                return self.chord_sizes[button_index], chord_states[button_index], edo  # Only draw for the first active slider
+
+        if len(self.symbols):
+            if self.ordering not in self.orderings:
+                self.orderings[self.ordering] = self.symbols[ordering_permutation(self.symbols, edo, self.ordering)]
+            symbols = self.orderings[self.ordering]
+            return symbols, None, edo
+        return None
+
+    def visible_tiles(self, binaries):
+        tile_height = TILE_ROWS * self.BINARY_SQUARE_SIZE
+        total_height = len(binaries) * self.BINARY_SQUARE_SIZE
+        first_tile = self.scroll_offset // tile_height
+        last_tile = min(self.scroll_offset + self.height, total_height - 1) // tile_height
+        return range(first_tile, last_tile + 1)
 
-        if self.symbols:
-            self.draw_binaries(self.symbols, [False] * len(self.symbols), base62_to_int(self.regions[0]["buttons"][self.selector_panel["selected"]]))
+    def binaries_key(self, binaries, states, edo):
+        return (self.scroll_offset, self.height, len(binaries),
+                tuple(self.tile_key(binaries, states, edo, tile) for tile in self.visible_tiles(binaries)))
 
     def draw_binaries(self, binaries, states, edo):
+        # only the tiles overlapping the viewport are drawn, recently drawn tiles are kept.
+        # states None means no row is selected.
         visible_height = self.height
         total_height = len(binaries) * self.BINARY_SQUARE_SIZE
         self.max_scroll_offset = max(0, total_height - visible_height)
-        
-        surface = pygame.Surface((self.left_region_width, total_height))
-        surface.fill(BLACK)
-        
-        for i, state in enumerate(states):
-            if state:
-                pygame.draw.rect(surface, SELECTED_BG, 
-                                pygame.Rect(0, i * self.BINARY_SQUARE_SIZE, 
-                                            self.left_region_width, self.BINARY_SQUARE_SIZE))
-        for i in range(1,edo):
-            pygame.draw.line(surface, MEDIUM_DARK_GRAY, (i * self.BINARY_SQUARE_SIZE, 0), 
-                            (i * self.BINARY_SQUARE_SIZE, total_height))
-        for i in range(1,len(binaries)):
-            pygame.draw.line(surface, MEDIUM_DARK_GRAY, (0, i * self.BINARY_SQUARE_SIZE), 
-                            (self.left_region_width, i * self.BINARY_SQUARE_SIZE))
-        for i, (binary, state) in enumerate(zip(binaries, states)):
-            for j, bit in enumerate(binary):
-                if bit == '1':
-                    color = BLUE if state else VERY_LIGHT_GRAY
-                    pygame.draw.rect(surface, color, 
-                                    pygame.Rect(j * self.BINARY_SQUARE_SIZE + 1, i * self.BINARY_SQUARE_SIZE + 1, 
-                                                self.BINARY_SQUARE_SIZE - 1, self.BINARY_SQUARE_SIZE - 1))
-        
-        self.screen.blit(surface, (0, 0), (0, self.scroll_offset, self.left_region_width, visible_height))
+
+        tile_height = TILE_ROWS * self.BINARY_SQUARE_SIZE
+        for tile in self.visible_tiles(binaries):
+            surface = self.binary_tile(binaries, states, edo, tile)
+            self.screen.blit(surface, (0, tile * tile_height - self.scroll_offset))
+
+    def tile_key(self, binaries, states, edo, tile):
+        start = tile * TILE_ROWS
+        stop = min(start + TILE_ROWS, len(binaries))
+        rows = tuple(int(binary) for binary in binaries[start:stop])
+        row_states = (False,) * len(rows) if states is None else tuple(states[start:stop].tolist())
+        return (edo, self.left_region_width, start, rows, row_states)
+
+    def binary_tile(self, binaries, states, edo, tile):
+        key = self.tile_key(binaries, states, edo, tile)
+        edo, _, start, rows, row_states = key
+        if key in self.tile_cache:
+            self.tile_cache.move_to_end(key)
+            return self.tile_cache[key]
+
+        # a palette index per pixel: every chord bit is a cell whose first pixel row
+        # and column hold the grid lines, selected rows are a mask over the background
+        size = self.BINARY_SQUARE_SIZE
+        bits = (np.array(rows, dtype=np.uint64)[:, None] >> np.arange(edo, dtype=np.uint64) & np.uint64(1)).astype(np.uint8)
+        selected = np.array(row_states, dtype=np.uint8)[:, None]
+        pixels = np.repeat(np.repeat(np.where(bits, CELL + selected, selected), size, axis=0), size, axis=1)
+        row_background = np.repeat(selected, size, axis=0)
+        if pixels.shape[1] < self.left_region_width:
+            pixels = np.hstack([pixels, np.repeat(row_background, self.left_region_width - pixels.shape[1], axis=1)])
+        pixels[::size] = selected
+        pixels[:, :edo * size:size] = row_background
+        pixels[:, size:edo * size:size] = LINE
+        # the first row of the list has no line above it
+        pixels[(size if start == 0 else 0)::size] = LINE
+        if self.left_region_width == 0:
+            return pygame.Surface((0, pixels.shape[0]))
+        surface = pygame.surfarray.make_surface(np.ascontiguousarray(pixels[:, :self.left_region_width].T))
+        surface.set_palette(TILE_PALETTE)
+
+        self.tile_cache[key] = surface
+        if len(self.tile_cache) > TILE_CACHE_SIZE:
+            self.tile_cache.popitem(last=False)
+        return surface
 
     def handle_mouse_down(self, pos):
         self.mouse_down_pos = pos
@@ -221,41 +372,119 @@ class ChordSizeSelector:
                     button_index = self.slider_positions[row]
                     binaries = self.chord_sizes[button_index]
                     chord_states = self.chord_states1 if row == 1 else self.chord_states2
-                    for i, binary in enumerate(binaries):
-                        binary_rect = pygame.Rect(0, i * self.BINARY_SQUARE_SIZE - self.scroll_offset, self.left_region_width, self.BINARY_SQUARE_SIZE)
-                        if binary_rect.collidepoint(pos):
-                            chord_states[button_index][i] = not chord_states[button_index][i]
-                            self.save_chord_sizes()
-                            self.draw()
-                            return
+                    i = (pos[1] + self.scroll_offset) // self.BINARY_SQUARE_SIZE
+                    # binaries is None while its size is still loading
+                    if binaries is not None and 0 <= pos[0] < self.left_region_width and 0 <= i < len(binaries):
+                        chord_states[button_index][i] = not chord_states[button_index][i]
+                        self.selection_toggled(row, button_index, i)
+                        self.draw()
+                        return
 
     def generate_and_save_chord_sizes(self):
         edo = base62_to_int(self.regions[0]["buttons"][self.selector_panel["selected"]])
-        self.chord_sizes, self.chord_states1, self.chord_states2 = generate_chord_sizes(edo)
-        self.save_chord_sizes()
+        self.chord_sizes = generate_chord_sizes(edo, self.request_shapes)
         self.load_chord_sizes()
+        # written back as loaded, so the toggles logged from now on belong to this edo
+        self.save_chord_sizes()
 
     def save_chord_sizes(self):
-        with open("chord_sizes.py", "w") as f:
-            f.write("CHORD_SIZES = " + repr(self.chord_sizes) + "\n")
-            f.write("CHORD_STATES1 = " + repr(self.chord_states1) + "\n")
-            f.write("CHORD_STATES2 = " + repr(self.chord_states2) + "\n")
+        # the shape tables are already cached on disk, only the selection is written.
+        # the writer thread gets a copy, so later toggles don't race with it
+        edo = base62_to_int(self.regions[0]["buttons"][self.selector_panel["selected"]])
+        copies = [[states.copy() for states in chord_states] for chord_states in (self.chord_states1, self.chord_states2)]
+        self.selection_writer.put(("snapshot", edo, *copies))
+
+    def selection_toggled(self, row, size, index):
+        # toggles are logged by the writer thread
+        edo = base62_to_int(self.regions[0]["buttons"][self.selector_panel["selected"]])
+        chord_states = self.chord_states1 if row == 1 else self.chord_states2
+        self.selection_writer.put(("toggle", edo, row, size, index, chord_states[size][index]))
 
     def load_chord_sizes(self):
-        try:
-            import chord_sizes
-            importlib.reload(chord_sizes)
-            self.chord_sizes = chord_sizes.CHORD_SIZES
-            self.chord_states1 = chord_sizes.CHORD_STATES1
-            self.chord_states2 = chord_sizes.CHORD_STATES2
-        except ImportError:
-            print("Error: Could not load chord_sizes.py")
-            self.chord_sizes = []
-            self.chord_states1 = []
-            self.chord_states2 = []
-
-    def draw_region(self, region):
-        label_surf = self.label_font.render(region["label"], True, LIGHT_GRAY)
+        edo = base62_to_int(self.regions[0]["buttons"][self.selector_panel["selected"]])
+        self.shape_loader["current"]["edo"] = edo
+        self.flush_selection()
+        self.chord_states1, self.chord_states2 = load_selection(edo)
+
+    def flush_selection(self):
+        # waits until everything queued for the writer thread is on disk
+        self.selection_writer.put(("flush",))
+        self.selection_writer.join()
+
+    def request_shapes(self, edo, size):
+        self.shape_loader["requests"].put((edo, size))
+
+    def poll_shape_loader(self):
+        # moves the tables the loader finished into the shape cache, tables of an
+        # edo that was switched away from are kept there too
+        changed = False
+        while True:
+            try:
+                edo, size, table = self.shape_loader["loaded"].get_nowait()
+            except queue.Empty:
+                break
+            if edo == self.chord_sizes.edo:
+                self.chord_sizes.pending.discard(size)
+                changed = True
+            if isinstance(table, Exception):
+                print(f"Error: Could not load the shapes of size {size}: {table}")
+                if edo == self.chord_sizes.edo:
+                    self.chord_sizes.failed.add(size)
+                continue
+            remember_shapes(edo, size, table)
+        if changed:
+            self.draw()
+
+    def region_area(self, region):
+        # the label, buttons and slider of a region
+        top = region["rect"].top - self.label_height
+        bottom = region["slider_rect"].bottom if "slider_rect" in region else region["rect"].bottom
+        return pygame.Rect(self.left_region_width, top, self.width - self.left_region_width, bottom - top)
+
+    def selected_sizes(self, row):
+        # whether any chord of each size is selected
+        chord_states = self.chord_states1 if row == 1 else self.chord_states2
+        return [states.count > 0 for states in chord_states]
+
+    def region_look(self, region):
+        # everything draw_region shows, so unchanged regions can be skipped
+        label = region["label"]
+        if label in ["shapes", "NOT shapes"]:
+            row = 1 if label == "shapes" else 4
+            if self.slider_positions[row] is not None:
+                edo = base62_to_int(self.regions[0]["buttons"][self.selector_panel["selected"]])
+                label += f" ({necklace_count(edo, self.slider_positions[row])})"
+
+        if region["is_top_bar"]:
+            if self.chord_sizes.pending:
+                label += f" (loading {', '.join(map(str, sorted(self.chord_sizes.pending)))})"
+            return label, self.selector_panel["selected"]
+
+        buttons = []
+        for i, button in enumerate(region["buttons"]):
+            if self.dragging and self.active_region == region and self.is_in_drag_range(button["rect"].centerx):
+                bg_color = VERY_LIGHT_GRAY if not self.initial_states[i] else BLACK
+                text_color = BLACK if not self.initial_states[i] else WHITE
+            else:
+                bg_color = VERY_LIGHT_GRAY if button["enabled"] else BLACK
+                text_color = BLACK if button["enabled"] else WHITE
+            buttons.append((bg_color, text_color))
+
+        sliders = None
+        if region["label"] in ["shapes", "NOT shapes"]:
+            row = 1 if region["label"] == "shapes" else 4
+            selected_sizes = self.selected_sizes(row)
+            sliders = []
+            for button in region["buttons"]:
+                chord_size = base62_to_int(button["label"])
+                any_chord_true = selected_sizes[chord_size] if chord_size < len(selected_sizes) else False
+                sliders.append(BLUE if any_chord_true else MEDIUM_GRAY)
+            sliders = (tuple(sliders), self.slider_positions[row])
+        return label, tuple(buttons), sliders
+
+    def draw_region(self, region, look):
+        label = look[0]
+        label_surf = self.render_text(self.label_font, label, LIGHT_GRAY)
         label_rect = label_surf.get_rect(topleft=(self.left_region_width, region["rect"].top - self.label_height))
         self.screen.blit(label_surf, label_rect)
 
@@ -263,46 +492,36 @@ class ChordSizeSelector:
             for j, (char, rect) in enumerate(zip(region["buttons"], region["rects"])):
                 color = VERY_LIGHT_GRAY if j == self.selector_panel["selected"] else DARK_GRAY
                 pygame.draw.rect(self.screen, color, rect)
-                text_surf = self.selector_font.render(char, True, BLACK if j == self.selector_panel["selected"] else LIGHTER_GRAY)
+                text_surf = self.render_text(self.selector_font, char, BLACK if j == self.selector_panel["selected"] else LIGHTER_GRAY)
                 text_rect = text_surf.get_rect(center=(rect.centerx, rect.centery))
                 self.screen.blit(text_surf, text_rect)
         else:
-            for button in region["buttons"]:
-                if self.dragging and self.active_region == region and self.is_in_drag_range(button["rect"].centerx):
-                    bg_color = VERY_LIGHT_GRAY if not self.initial_states[region["buttons"].index(button)] else BLACK
-                    text_color = BLACK if not self.initial_states[region["buttons"].index(button)] else WHITE
-                else:
-                    bg_color = VERY_LIGHT_GRAY if button["enabled"] else BLACK
-                    text_color = BLACK if button["enabled"] else WHITE
-
+            _, buttons, sliders = look
+            for button, (bg_color, text_color) in zip(region["buttons"], buttons):
                 pygame.draw.rect(self.screen, bg_color, button["rect"])
-                text_surf = self.font.render(button["label"], True, text_color)
+                text_surf = self.render_text(self.font, button["label"], text_color)
                 text_rect = text_surf.get_rect(center=button["rect"].center)
                 self.screen.blit(text_surf, text_rect)
 
-            if region["label"] in ["shapes", "NOT shapes"]:
-                row = 1 if region["label"] == "shapes" else 4
+            if sliders is not None:
+                slider_colors, slider_position = sliders
                 pygame.draw.rect(self.screen, GRAY, region["slider_rect"])
                 
-                chord_states = self.chord_states1 if row == 1 else self.chord_states2
-                
-                for i, button in enumerate(region["buttons"]):
-                    chord_size = base62_to_int(button["label"])
-                    any_chord_true = any(chord_states[chord_size]) if chord_size < len(chord_states) else False
-                    
+                for i, slider_color in enumerate(slider_colors):
                     slider_x = region["slider_rect"].left + i * region["slider_rect"].width // len(region["buttons"])
                     slider_width = region["slider_rect"].width // len(region["buttons"])
-                    slider_color = BLUE if any_chord_true else MEDIUM_GRAY
                     pygame.draw.rect(self.screen, slider_color, pygame.Rect(slider_x, region["slider_rect"].top, slider_width, region["slider_rect"].height))
                 
-                if self.slider_positions[row] is not None:
-                    slider_x = region["slider_rect"].left + self.slider_positions[row] * region["slider_rect"].width // len(region["buttons"])
+                if slider_position is not None:
+                    slider_x = region["slider_rect"].left + slider_position * region["slider_rect"].width // len(region["buttons"])
                     slider_width = region["slider_rect"].width // len(region["buttons"])
                     pygame.draw.rect(self.screen, SLIDER_COLOR, pygame.Rect(slider_x, region["slider_rect"].top, slider_width, region["slider_rect"].height))
 
     def handle_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                # wait for the last toggles to be written
+                self.flush_selection()
                 return False
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:  # Left mouse button
@@ -320,9 +539,13 @@ class ChordSizeSelector:
                     self.handle_mouse_drag(event.pos)
             elif event.type == pygame.VIDEORESIZE:
                 self.handle_resize(event.size)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_o:
+                self.cycle_ordering()
+
+        self.poll_shape_loader()
 
         if self.pending_edo_update is not None:
-            self.symbols = []
+            self.symbols, self.orderings = [], {}
             self.selector_panel["selected"] = self.pending_edo_update
             self.update_layout()
             self.generate_and_save_chord_sizes()
@@ -414,37 +637,33 @@ class ChordSizeSelector:
             "INTERVAL_VARIATIONS1": [base62_to_int(b["label"]) for b in self.regions[3]["buttons"] if b["enabled"]],
             "ALL_UNIQUE_BINARIES2": [base62_to_int(b["label"]) for b in self.regions[4]["buttons"] if b["enabled"]],
             "ROTATIONS2": [base62_to_int(b["label"]) for b in self.regions[5]["buttons"] if b["enabled"]],
-            "INTERVAL_VARIATIONS2": [base62_to_int(b["label"]) for b in self.regions[6]["buttons"] if b["enabled"]]
+            "INTERVAL_VARIATIONS2": [base62_to_int(b["label"]) for b in self.regions[6]["buttons"] if b["enabled"]],
+            "STREAMING": True
         }
 
         # Convert selected binaries to the required format
-        specific_chords1 = []
-        specific_chords2 = []
-
-        for i, chord_set in enumerate(self.chord_states1):
-            for j, is_selected in enumerate(chord_set):
-                if is_selected:
-                    specific_chords1.append((i, j))
-
-        for i, chord_set in enumerate(self.chord_states2):
-            for j, is_selected in enumerate(chord_set):
-                if is_selected:
-                    specific_chords2.append((i, j))
+        specific_chords1 = [(i, j) for i, chord_set in enumerate(self.chord_states1) for j in chord_set.selected().tolist()]
+        specific_chords2 = [(i, j) for i, chord_set in enumerate(self.chord_states2) for j in chord_set.selected().tolist()]
 
         settings["SPECIFIC_CHORDS1"] = specific_chords1
         settings["SPECIFIC_CHORDS2"] = specific_chords2
 
-        with open("settings.py", "w") as f:
-            for key, value in settings.items():
-                f.write(f"{key} = {value}\n")
-
-        os.system("python edo_graphs2.py")
-        self.load_symbols()
+        self.save_chord_sizes()
+        self.symbols = generate_chords(settings)
+        self.orderings = {}
+        write_results(RESULTS_FILE, edo, [self.symbols])
 
         self.slider_positions = {1: None, 4: None}
         self.scroll_offset = 0
         self.draw()
 
+    def cycle_ordering(self):
+        orderings = list(ORDERINGS)
+        self.ordering = orderings[(orderings.index(self.ordering) + 1) % len(orderings)]
+        pygame.display.set_caption(f"edo graphs v0.2 - {self.ordering}")
+        self.scroll_offset = 0
+        self.draw()
+
     def update_layout(self):
         self.calculate_window_size()
         self.update_selector_rects()
@@ -452,17 +671,9 @@ class ChordSizeSelector:
         self.create_regions()
         self.create_print_button()
         self.screen = pygame.display.set_mode((self.width, self.height), pygame.RESIZABLE)
+        self.drawn = {}
         self.draw()
 
-    def load_symbols(self):
-        try:
-            import symbols
-            importlib.reload(symbols)
-            self.symbols = symbols.SYMBOLS
-        except ImportError:
-            print("Error: Could not load symbols.py")
-            self.symbols = []
-
     def run(self):
         clock = pygame.time.Clock()
         while self.handle_events():
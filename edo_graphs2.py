@@ -1,9 +1,17 @@
 from itertools import combinations
-from settings import *
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import os
+from math import comb, gcd, log2
+import numpy as np
 
 CHARACTERS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
 CHAR_TO_VALUE = {char: index for index, char in enumerate(CHARACTERS)}
 
+# chords are int bitmasks: the edo-digit binary form of the int is the chord's
+# binary string, so int order is the same as the old string order.
+# sets of chords are plain sets of ints, strings only appear in generate_symbols.
+
 def int_to_base62(num):
     if num == 0:
         return CHARACTERS[0]
@@ -13,168 +21,455 @@ def int_to_base62(num):
         num //= 62
     return result
 
+def mask_to_binary(mask, edo):
+    return format(mask, f'0{edo}b')
+
 def binaries_with_n_ones(length, num_ones):
     masks = [1 << i for i in range(length)]
-    return [format(sum(masks[i] for i in comb), f'0{length}b') 
-            for comb in combinations(range(length), num_ones)]
-
-def smallest_rotation(s):  # booth's algorithm
-    s = s + s
-    n = len(s) // 2
-    f = [-1] * len(s)
-    k = 0
-    for j in range(1, len(s)):
-        i = f[j - k - 1]
-        while i != -1 and s[j] != s[k + i + 1]:
-            if s[j] < s[k + i + 1]:
-                k = j - i - 1
-            i = f[i]
-        if i == -1 and s[j] != s[k + i + 1]:
-            if s[j] < s[k + i + 1]:
-                k = j
-            f[j - k] = -1
-        else:
-            f[j - k] = i + 1
-    rotation_count = (n-k) % n
-    return s[k:k + n], CHARACTERS[rotation_count]
-
-def unique_binaries(edo, chord_sizes=None):
+    return [sum(masks[i] for i in comb) for comb in combinations(range(length), num_ones)]
+
+def rotate(mask, step, edo):
+    # same as binary[step:] + binary[:step] on the string form
+    step %= edo
+    return ((mask << step) | (mask >> (edo - step))) & ((1 << edo) - 1)
+
+# loaded canonical lookup tables by edo (None where there is none), see chord_cache.
+# only tables already on disk are mapped, prepare_canonical_lookup builds them
+CANONICAL_LOOKUPS = {}
+
+def canonical_lookup(edo):
+    if edo not in CANONICAL_LOOKUPS:
+        from chord_cache import load_canonical_lookup
+        CANONICAL_LOOKUPS[edo] = load_canonical_lookup(edo)
+    return CANONICAL_LOOKUPS[edo]
+
+POPCOUNT_BYTES = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def popcounts(chords):
+    chords = np.ascontiguousarray(chords, dtype=np.uint64)
+    return POPCOUNT_BYTES[chords.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.uint8)
+
+def smallest_rotation(mask, edo):
+    lookup = canonical_lookup(edo)
+    if lookup is not None:
+        canonical, steps, _ = lookup
+        return int(canonical[mask]), CHARACTERS[(edo-int(steps[mask])) % edo]
+    smallest, k = mask, 0
+    for j in range(1, edo):
+        rotated = rotate(mask, j, edo)
+        if rotated < smallest:
+            smallest, k = rotated, j
+    rotation_count = (edo-k) % edo
+    return smallest, CHARACTERS[rotation_count]
+
+def rotation_period(mask, edo):
+    # the number of distinct rotations of a chord, edo // period rotations leave it unchanged
+    return next(p for p in divisors(edo) if rotate(mask, p, edo) == mask)
+
+def necklaces(edo, chord_size, start=0, stop=None):
+    # canonical (smallest rotation) chords with chord_size ones, in increasing order,
+    # from the first one that is >= start up to (not including) stop.
+    # a chord is read as its cyclic sequence of gaps between ones, and the gap
+    # sequences are generated with the FKM necklace algorithm restricted to gaps
+    # that sum to edo (Ruskey-Sawada fixed density), so the work is proportional
+    # to the number of necklaces instead of C(edo, chord_size).
+    # larger leading gaps mean more leading zeros, so gaps are tried largest first.
+    n, k = edo, chord_size
+    if k > n:
+        return
+    if k == 0 or k == 1 or k == n:
+        if (1 << k) - 1 >= start and (stop is None or (1 << k) - 1 < stop):
+            yield (1 << k) - 1
+        return
+    gaps = [0] * k     # gaps[t]: gap in front of the t-th one
+    period = [1] * k   # period[t]: length of the longest lyndon prefix of gaps[1..t]
+    total = [0] * k    # total[t]: gaps[1] + ... + gaps[t]
+    masks = [0] * k    # masks[t]: chord bits placed by the first t gaps
+    fkm = [0] * k      # fkm[t]: the gap that keeps the current period at position t
+    low = [0] * k
+    gap = [0] * k      # gap[t]: next gap to try at position t
+    t = 1
+    gap[1], low[1], fkm[1] = n - k + 1, -(-n // k), 0
+    while t:
+        g = gap[t]
+        if g < low[t]:
+            t -= 1
+            gap[t] -= 1
+            continue
+        gaps[t] = g
+        p = period[t-1] if g == fkm[t] else t
+        period[t] = p
+        total[t] = total[t-1] + g
+        masks[t] = masks[t-1] | 1 << (n - total[t])
+        if start and masks[t] | ((1 << (n - total[t])) - 1) < start:
+            # everything below this prefix sorts before start
+            gap[t] -= 1
+            continue
+        if t == k - 1:
+            # the last gap is whatever is left, so the last position is settled here
+            last, keep = n - total[t], gaps[k - p]
+            if (last < keep or (last == keep and k % p == 0)) and masks[t] | 1 >= start:
+                if stop is not None and masks[t] | 1 >= stop:
+                    return
+                start = 0
+                yield masks[t] | 1
+            gap[t] -= 1
+            continue
+        t += 1
+        remaining = n - total[t-1]
+        fkm[t] = gaps[t - p]
+        gap[t] = min(fkm[t], remaining - (k-t))
+        low[t] = max(1, remaining - (k-t) * gaps[1])
+
+# process pool enumeration: sizes with fewer shapes than this stay in one shard,
+# and below PARALLEL_MIN_SHAPES in total the pool isn't worth starting at all
+SHARD_MIN_SHAPES = 50000
+PARALLEL_MIN_SHAPES = 200000
+
+def necklace_shard(edo, chord_size, start, stop):
+    return np.fromiter(necklaces(edo, chord_size, start, stop), dtype=np.uint64)
+
+def necklace_tables(edo, chord_sizes, workers=None):
+    # the shapes of each size as sorted uint64 arrays, same as the necklaces generator.
+    # sizes are cut into shards of equal shape count (bounds found by unranking)
+    # which run on a process pool and are joined back in order.
+    workers = workers or os.cpu_count() or 1
+    chord_sizes = list(chord_sizes)
+    counts = [necklace_count(edo, size) for size in chord_sizes]
+    if workers == 1 or sum(counts) < PARALLEL_MIN_SHAPES:
+        return [necklace_shard(edo, size, 0, None) for size in chord_sizes]
+    shards = []
+    for i, (size, count) in enumerate(zip(chord_sizes, counts)):
+        pieces = max(1, min(4 * workers, count // SHARD_MIN_SHAPES))
+        bounds = [necklace_unrank(count * j // pieces, edo, size) for j in range(pieces)] + [None]
+        shards += [(i, size, bounds[j], bounds[j+1]) for j in range(pieces)]
+    tables = [[] for _ in chord_sizes]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(necklace_shard, [edo] * len(shards), [shard[1] for shard in shards],
+                           [shard[2] for shard in shards], [shard[3] for shard in shards])
+        for shard, result in zip(shards, results):
+            tables[shard[0]].append(result)
+    return [np.concatenate(table) for table in tables]
+
+def necklace_table(edo, chord_size):
+    # the shapes of one size as uint64, from the shape tables of chord_cache so
+    # generate calls reuse what the selector and earlier runs already loaded
+    from chord_cache import shape_table
+    return shape_table(edo, chord_size).astype(np.uint64)
+
+@lru_cache(maxsize=64)
+def orbit_table(edo, chord_size):
+    # periods and stabilizer sizes of the shapes, in the order of necklace_table.
+    # a shape has exactly period distinct rotations: steps 0 to period-1
+    periods = rotation_periods(necklace_table(edo, chord_size), edo)
+    return periods, edo // periods
+
+def shape_rotations(edo, chord_size):
+    # every distinct rotation of every shape of one size, straight from the orbit table
+    shapes = necklace_table(edo, chord_size)
+    periods = orbit_table(edo, chord_size)[0]
+    return np.concatenate([rotate_array(shapes[periods > step], step, edo) for step in range(edo)])
+
+def rotation_count(chords, edo):
+    # len(all_rotations(chords, edo)) without listing them
+    return int(rotation_periods(np.fromiter(chords, dtype=np.uint64), edo).sum(dtype=np.int64))
+
+def unique_binaries(edo, chord_sizes=None, workers=1):
     if isinstance(chord_sizes, int):
         chord_sizes = [chord_sizes]
-    def unique_binaries_2(edo, chord_size):
-        binaries = set()
-        for binary in binaries_with_n_ones(edo, chord_size):
-            binaries.add(smallest_rotation(binary)[0])
-        return binaries
-
-    def all_unique_binaries(edo):
-        return [unique_binaries_2(edo, s) for s in range(edo+1)]
-    result = set()
     if chord_sizes is None:
-        for b in all_unique_binaries(edo):
-            result.update(b)
+        chord_sizes = range(edo+1)
+    chord_sizes = sorted(set(chord_sizes))
+    # each size is already sorted and sizes never share a chord
+    result = []
+    if workers != 1:
+        for table in necklace_tables(edo, chord_sizes, workers):
+            result.extend(table.tolist())
     else:
         for size in chord_sizes:
-            result.update(unique_binaries_2(edo, size))
-    return sorted(result, key=lambda x: int(x, 2))
+            result.extend(necklace_table(edo, size).tolist())
+    if len(chord_sizes) > 1:
+        result.sort()
+    return result
 
-def binary_to_positions(binary):
-    return ''.join([CHARACTERS[11-i] for i, bit in enumerate(binary) if bit == '1'])
+def binary_to_positions(binary, edo):
+    return ''.join([CHARACTERS[11-i] for i in range(edo) if binary >> (edo-1-i) & 1])
 
-def binary_to_gap_lengths(binary, simplify=False):
+def binary_to_gap_lengths(binary, edo, simplify=False):
     gaps = []
     gap_count = 0 if simplify else 1
-    binary += binary[0]
-    for bit in binary:
-        if bit == '0':
+    bits = [binary >> (edo-1-i) & 1 for i in range(edo)]
+    bits.append(bits[0])
+    for bit in bits:
+        if bit == 0:
             gap_count += 1
         else:
             gaps.append(gap_count)
             gap_count = 0 if simplify else 1
 
-    if binary[0] != '0':
+    if bits[0] != 0:
         gaps = gaps[1:]
     return ''.join(CHARACTERS[gap] for gap in gaps)
 
-def generate_interval_variations(binary, step_size, do_both_directions=False):
-    length = len(binary)
+def generate_interval_variations(binary, edo, step_size, do_both_directions=False):
     variations = set()
-    one_positions = [i for i, bit in enumerate(binary) if bit == '1']
-    
+    # string position i is bit edo-1-i, so moving a voice up the string moves it down the int
+    one_bits = [i for i in range(edo) if binary >> i & 1]
+
     if type(step_size) == int:
         step_size = [step_size]
-    
+
     for step in step_size:
-        for pos in one_positions:
-            new_binary = list(binary)
-            new_binary[pos] = '0'
-            new_pos = (pos + step) % length
-            if new_binary[new_pos] == '0':
-                new_binary[new_pos] = '1'
-                new_binary_str = ''.join(new_binary)
-                variations.add(new_binary_str)
+        for bit in one_bits:
+            new_binary = binary & ~(1 << bit)
+            new_bit = (bit - step) % edo
+            if not new_binary >> new_bit & 1:
+                variations.add(new_binary | 1 << new_bit)
             if do_both_directions:
-                new_binary = list(binary)
-                new_binary[pos] = '0'
-                new_pos = (pos - step) % length
-                if new_binary[new_pos] == '0':
-                    new_binary[new_pos] = '1'
-                    new_binary_str = ''.join(new_binary)
-                    variations.add(new_binary_str)
+                new_bit = (bit + step) % edo
+                if not new_binary >> new_bit & 1:
+                    variations.add(new_binary | 1 << new_bit)
     return sorted(variations)
 
-def all_rotations(input_data):
+def all_rotations(input_data, edo):
     list_of_chords = []
-    if isinstance(input_data, str):
-        # Handle single binary number
-        rotations = [input_data[i:] + input_data[:i] for i in range(len(input_data))]
+    # only the distinct rotations, symmetric chords repeat after their period
+    if isinstance(input_data, int):
+        # Handle single chord
+        rotations = [rotate(input_data, i, edo) for i in range(rotation_period(input_data, edo))]
         list_of_chords.extend(rotations)
     elif isinstance(input_data, list):
-        # Handle list of binary numbers
+        # Handle list of chords
         for binary in input_data:
-            rotations = [binary[i:] + binary[:i] for i in range(len(binary))]
+            rotations = [rotate(binary, i, edo) for i in range(rotation_period(binary, edo))]
             list_of_chords.extend(rotations)
     else:
-        raise ValueError("input must be a string or a list of strings")
+        raise ValueError("input must be an int or a list of ints")
 
     return list_of_chords
 
 
-def generate_symbols(list_of_chords, reduce_relative=False, truncate_relative=False, absolute_smallest=False, style='actual'):
-    list_of_chords = sorted(list_of_chords, key=lambda x: int(x, 2))
-    output_list = []
-    for i in list_of_chords:
-        if style == 'relative':
-            binary, key = smallest_rotation(i)
-            gaps = binary_to_gap_lengths(binary, reduce_relative)
-            relative = (gaps[::-1][:-1] if truncate_relative else gaps[::-1]) + '.'+key
-            output_list.append(relative)
-        elif style == 'absolute':
-            if absolute_smallest:
-                binary, key = smallest_rotation(i)
-                positions = binary_to_positions(binary)
-                absolute = positions[::-1] + '.'+key
-            else:
-                positions = binary_to_positions(i)
-                absolute = positions[::-1]
-            output_list.append(absolute)
-        elif style == 'actual':
-            if absolute_smallest:
-                binary, key = smallest_rotation(i)
-                smallest = binary[::-1] + '.'+key
-                output_list.append(smallest)
-            else:
-                actual = i[::-1]
-                output_list.append(actual)
-
-    return output_list
-
-def add_all_rotations_to_set(set):
-    for i in [all_rotations(e) for e in set]:
+@lru_cache(maxsize=1 << 16)
+def necklace_symbol(smallest, edo, style, reduce_relative=False, truncate_relative=False):
+    # the part of a symbol that every rotation of a necklace shares, the key follows it
+    if style == 'relative':
+        gaps = binary_to_gap_lengths(smallest, edo, reduce_relative)
+        return (gaps[::-1][:-1] if truncate_relative else gaps[::-1]) + '.'
+    elif style == 'absolute':
+        return binary_to_positions(smallest, edo)[::-1] + '.'
+    return mask_to_binary(smallest, edo)[::-1] + '.'
+
+def packed_strings(chars):
+    # rows of ascii codes to strings, zeros at the end of a row are dropped
+    if chars.shape[1] == 0:
+        return [''] * len(chars)
+    return np.ascontiguousarray(chars, dtype=np.uint8).view(f'S{chars.shape[1]}').ravel().astype(str).tolist()
+
+def symbol_columns(chords, edo, styles=('actual', 'absolute', 'relative'), reduce_relative=False,
+                   truncate_relative=False, absolute_smallest=False):
+    # the symbols of chords in the given order, as a list per style. symbols of the
+    # chords themselves are built from their bit columns all at once, symbols made
+    # from the smallest rotation are looked up once per necklace and get a key added.
+    columns = {style: [] for style in styles}
+    keys = [CHARACTERS[(edo-step) % edo] for step in range(max(edo, 1))]
+    absolute_chars = np.array([ord(CHARACTERS[11-(edo-1-bit)]) for bit in range(edo)], dtype=np.uint8)
+    chords = np.asarray(chords, dtype=np.uint64)
+    for start in range(0, len(chords), STREAM_CHUNK):
+        chunk = chords[start:start+STREAM_CHUNK]
+        bits = (chunk[:, None] >> np.arange(edo, dtype=np.uint64) & np.uint64(1)).astype(bool)
+        if 'relative' in styles or absolute_smallest:
+            smallest, steps = canonical_rotations(chunk, edo)
+            necklaces, inverse = np.unique(smallest, return_inverse=True)
+            necklaces, inverse, steps = necklaces.tolist(), inverse.ravel().tolist(), steps.tolist()
+        for style in styles:
+            if style == 'relative' or absolute_smallest and style in ('actual', 'absolute'):
+                prefixes = [necklace_symbol(necklace, edo, style, reduce_relative, truncate_relative) for necklace in necklaces]
+                columns[style] += [prefixes[k] + keys[step] for k, step in zip(inverse, steps)]
+            elif style == 'actual':
+                # column j is bit j, the reversed binary
+                columns[style] += packed_strings(bits.astype(np.uint8) + ord('0'))
+            elif style == 'absolute':
+                # set bits first, in bit order
+                order = np.argsort(~bits, axis=1, kind='stable')
+                columns[style] += packed_strings(np.take_along_axis(np.where(bits, absolute_chars, 0), order, axis=1))
+    return columns
+
+def generate_symbols(list_of_chords, edo, reduce_relative=False, truncate_relative=False, absolute_smallest=False, style='actual'):
+    chords = np.sort(np.fromiter(list_of_chords, dtype=np.uint64))
+    return symbol_columns(chords, edo, (style,), reduce_relative, truncate_relative, absolute_smallest)[style]
+
+def add_all_rotations_to_set(set, edo):
+    for i in [all_rotations(e, edo) for e in set]:
         if isinstance(i, list):
             for e in i:
                 set.add(e)
         else:
             set.add(i)
 
-def add_all_interval_variations_to_set(input_set, intervals, both_directions=False):
+def add_all_interval_variations_to_set(input_set, edo, intervals, both_directions=False):
     if intervals == None:
         return input_set
     elif intervals == []:
         return input_set
-    new_set = set()
-    for i in [generate_interval_variations(e, intervals, both_directions) for e in input_set]:
-        if isinstance(i, list):
-            for e in i:
-                new_set.add(e)
+    chords = np.fromiter(input_set, dtype=np.uint64, count=len(input_set))
+    return set(interval_variations_array(chords, edo, intervals, both_directions).tolist())
+
+# voice leading graphs with more edges than this aren't built, moves are applied directly
+INTERVAL_GRAPH_MAX_EDGES = 1 << 24
+# loaded voice leading graphs by (edo, chord size, offsets), see chord_cache
+INTERVAL_GRAPHS = {}
+
+def interval_offsets(edo, intervals, both_directions=False):
+    # the bit offsets a voice can move by. generate_interval_variations moves a
+    # voice down the int by step, and with both directions up by step as well.
+    if isinstance(intervals, int):
+        intervals = [intervals]
+    offsets = {-step % edo for step in intervals}
+    if both_directions:
+        offsets.update(step % edo for step in intervals)
+    return tuple(sorted(offsets))
+
+def variation_moves(chords, edo, offsets):
+    # every single voice move of every chord, as (index of the chord, new chord)
+    index = np.arange(len(chords))
+    sources, variations = [], []
+    for bit in range(edo):
+        has_voice = chords >> bit & 1 == 1
+        voices, voice_index = chords[has_voice] & ~np.uint64(1 << bit), index[has_voice]
+        for offset in offsets:
+            new_bit = (bit + offset) % edo
+            free = voices >> new_bit & 1 == 0
+            sources.append(voice_index[free])
+            variations.append(voices[free] | np.uint64(1 << new_bit))
+    return np.concatenate(sources), np.concatenate(variations)
+
+def build_interval_graph(shapes, edo, offsets):
+    # csr adjacency of the voice leading graph between the shapes of one size.
+    # shape i leads to shapes neighbors[indptr[i]:indptr[i+1]], and rotating each of
+    # those by the matching shifts gives the actual variation. moves commute with
+    # rotation, so a rotated chord's variations are the same entries rotated further.
+    shapes = np.asarray(shapes, dtype=np.uint64)
+    sources, variations = variation_moves(shapes, edo, offsets)
+    canonical, steps = canonical_rotations(variations, edo)
+    targets = np.searchsorted(shapes, canonical)
+    shifts = (edo - steps.astype(np.int64)) % edo
+    edges = np.unique((sources * len(shapes) + targets) * edo + shifts)
+    sources, rest = np.divmod(edges, len(shapes) * edo)
+    indptr = np.zeros(len(shapes)+1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=len(shapes)), out=indptr[1:])
+    return indptr, (rest // edo).astype(np.uint32), (rest % edo).astype(np.uint8)
+
+# edos up to this search several interval moves over tables of every chord
+REACH_MAX_EDO = 26
+
+def move_voices(table, edo, offsets):
+    # one interval move of every chord of a table over all 2**edo chords, in place of
+    # a list of chords. viewed as an edo dimensional 2x2x..x2 array, moving a voice
+    # from one bit to a free bit is a copy between two quarter slices of the array.
+    table = table.reshape((2,) * edo)
+    reached = np.zeros_like(table)
+    for bit in range(edo):
+        for offset in offsets:
+            new_bit = (bit + offset) % edo
+            source, target = [slice(None)] * edo, [slice(None)] * edo
+            # the last axis is bit 0
+            source[edo-1-bit] = target[edo-1-new_bit] = 1
+            if new_bit != bit:
+                source[edo-1-new_bit] = target[edo-1-bit] = 0
+            reached[tuple(target)] |= table[tuple(source)]
+    return reached.reshape(-1)
+
+def interval_reach(chords, edo, intervals, depth, exclude=None, both_directions=True):
+    # every chord reachable from chords in 1 to depth interval moves, found breadth
+    # first. depth 1 gives the same chords as add_all_interval_variations_to_set.
+    # chords in exclude are dropped at every step, so nothing is reached through them.
+    # up to REACH_MAX_EDO the frontier is a table over all chords, small frontiers
+    # are expanded chord by chord and large ones with move_voices.
+    offsets = interval_offsets(edo, intervals, both_directions)
+    chords = np.unique(np.asarray(chords, dtype=np.uint64))
+    exclude = np.unique(np.asarray([] if exclude is None else exclude, dtype=np.uint64))
+    if edo > REACH_MAX_EDO:
+        visited = np.union1d(chords, exclude)
+        frontier, reached = chords, []
+        for step in range(depth):
+            variations = np.unique(variation_moves(frontier, edo, offsets)[1])
+            variations = variations[~np.isin(variations, exclude)]
+            reached.append(variations)
+            frontier = variations[~np.isin(variations, visited)]
+            if not len(frontier):
+                break
+            visited = np.union1d(visited, frontier)
+        return np.unique(np.concatenate(reached)) if reached else chords[:0]
+    allowed = np.ones(1 << edo, dtype=bool)
+    allowed[exclude] = False
+    visited = ~allowed
+    visited[chords] = True
+    reached = np.zeros(1 << edo, dtype=bool)
+    frontier = chords
+    for step in range(depth):
+        if isinstance(frontier, np.ndarray) and frontier.dtype == bool:
+            variations = move_voices(frontier, edo, offsets)
         else:
-            new_set.add(i)
-    return new_set
+            variations = np.zeros(1 << edo, dtype=bool)
+            variations[variation_moves(frontier, edo, offsets)[1]] = True
+        variations &= allowed
+        reached |= variations
+        variations &= ~visited
+        visited |= variations
+        count = np.count_nonzero(variations)
+        if not count:
+            break
+        # expanding chord by chord costs about edo * offsets per chord
+        frontier = variations if count * edo * len(offsets) > 1 << edo else np.flatnonzero(variations).astype(np.uint64)
+    return np.flatnonzero(reached).astype(np.uint64)
+
+def interval_graph(edo, chord_size, offsets):
+    key = (edo, chord_size, offsets)
+    if key not in INTERVAL_GRAPHS:
+        from chord_cache import load_interval_graph
+        INTERVAL_GRAPHS[key] = load_interval_graph(edo, chord_size, offsets)
+    return INTERVAL_GRAPHS[key]
+
+def interval_variations_array(chords, edo, intervals, both_directions=False):
+    # generate_interval_variations for a whole array at once (repeats are kept).
+    # a gather over the neighbor lists of the cached voice leading graph of each size.
+    chords = np.asarray(chords, dtype=np.uint64)
+    offsets = interval_offsets(edo, intervals, both_directions)
+    sizes = popcounts(chords)
+    variations = [np.zeros(0, dtype=np.uint64)]
+    for size in np.unique(sizes).tolist():
+        group = chords[sizes == size]
+        if necklace_count(edo, size) * size * len(offsets) > INTERVAL_GRAPH_MAX_EDGES:
+            variations.append(variation_moves(group, edo, offsets)[1])
+            continue
+        shapes, indptr, neighbors, shifts = interval_graph(edo, size, offsets)
+        canonical, steps = canonical_rotations(group, edo)
+        ranks = np.searchsorted(shapes, canonical.astype(shapes.dtype))
+        starts, counts = indptr[ranks], indptr[ranks+1] - indptr[ranks]
+        edges = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+        rotation = np.repeat((edo - steps.astype(np.int64)) % edo, counts)
+        targets = shapes[neighbors[edges]].astype(np.uint64)
+        variations.append(rotate_array(targets, (shifts[edges] + rotation) % edo, edo))
+    return np.concatenate(variations)
+
+# chord pairs compared at once by the numpy filter, bounds its temporary arrays
+FILTER_CHUNK = 1 << 20
+# largest edo for which the zeta filter may build its 2**edo table
+ZETA_MAX_EDO = 26
 
 def filter_chords(set_of_chords, anti_set_of_chords, MODE = True):
+    edo = max(max(set_of_chords, default=0).bit_length(), max(anti_set_of_chords, default=0).bit_length())
+    if edo > 64:
+        return filter_chords_python(set_of_chords, anti_set_of_chords, MODE)
+    # comparing every pair costs |set| * |anti set|, the zeta table about edo * 2**edo
+    if not MODE and edo <= ZETA_MAX_EDO and len(set_of_chords) * len(anti_set_of_chords) > edo << edo:
+        return filter_chords_zeta(set_of_chords, anti_set_of_chords, MODE, edo)
+    return filter_chords_numpy(set_of_chords, anti_set_of_chords, MODE)
+
+def filter_chords_python(set_of_chords, anti_set_of_chords, MODE = True):
     if MODE:
         def is_subset(subset, superset):
-            return (int(subset, 2) & int(superset, 2)) == int(superset, 2)
+            return (subset & superset) == superset
         filtered_chords = set()
         for chord in set_of_chords:
             A = [is_subset(anti_chord, chord) for anti_chord in anti_set_of_chords]
@@ -184,7 +479,7 @@ def filter_chords(set_of_chords, anti_set_of_chords, MODE = True):
         return filtered_chords
     else:
         def is_subset(subset, superset):
-            return (int(subset, 2) | int(superset, 2)) == int(superset, 2)
+            return (subset | superset) == superset
         filtered_chords = set()
         for chord in set_of_chords:
             A = [is_subset(anti_chord, chord) for anti_chord in anti_set_of_chords]
@@ -193,91 +488,497 @@ def filter_chords(set_of_chords, anti_set_of_chords, MODE = True):
 
         return filtered_chords
 
-def rotate_by_step(binary_set, step_size):
+def inside_all(chords, anti_chords):
+    # a chord is inside every anti chord exactly when it is inside their intersection
+    common = np.bitwise_and.reduce(anti_chords) if len(anti_chords) else ~np.uint64(0)
+    return chords & ~common == 0
+
+def contains_any(chords, anti_chords):
+    # compares a block of rows against all anti chords at a time
+    found = np.zeros(len(chords), dtype=bool)
+    if len(anti_chords):
+        rows = max(1, FILTER_CHUNK // len(anti_chords))
+        for start in range(0, len(chords), rows):
+            block = ~chords[start:start+rows, None]
+            found[start:start+rows] = (anti_chords & block == 0).any(axis=1)
+    return found
+
+def filter_chords_numpy(set_of_chords, anti_set_of_chords, MODE = True):
+    chords = np.fromiter(set_of_chords, dtype=np.uint64, count=len(set_of_chords))
+    anti_chords = np.fromiter(anti_set_of_chords, dtype=np.uint64, count=len(anti_set_of_chords))
+    keep = inside_all(chords, anti_chords) if MODE else ~contains_any(chords, anti_chords)
+    return set(chords[keep].tolist())
+
+def superset_closure(anti_chords, edo):
+    # contains[x] is True when chord x contains at least one of the anti chords.
+    # superset zeta transform: push every entry up along one bit at a time.
+    contains = np.zeros(1 << edo, dtype=bool)
+    contains[anti_chords] = True
+    for bit in range(edo):
+        view = contains.reshape(-1, 2, 1 << bit)
+        view[:, 1, :] |= view[:, 0, :]
+    return contains
+
+def filter_chords_zeta(set_of_chords, anti_set_of_chords, MODE = True, edo = None):
+    if MODE:
+        return filter_chords_numpy(set_of_chords, anti_set_of_chords, MODE)
+    chords = np.fromiter(set_of_chords, dtype=np.uint64, count=len(set_of_chords))
+    anti_chords = np.fromiter(anti_set_of_chords, dtype=np.uint64, count=len(anti_set_of_chords))
+    if edo is None:
+        edo = int(max(chords.max(initial=0), anti_chords.max(initial=0))).bit_length()
+    keep = ~superset_closure(anti_chords, edo)[chords]
+    return set(chords[keep].tolist())
+
+def chord_filter(anti_chords, edo, MODE = True):
+    # filter_chords for a stream: returns a function that gives the keep mask of a chunk
+    if MODE:
+        return lambda chunk: inside_all(chunk, anti_chords)
+    if edo <= ZETA_MAX_EDO and len(anti_chords) * STREAM_CHUNK > edo << edo:
+        contains = superset_closure(anti_chords, edo)
+        return lambda chunk: ~contains[chunk]
+    return lambda chunk: ~contains_any(chunk, anti_chords)
+
+def rotate_by_step(binary_set, edo, step_size):
     rotated_set = set()
     for binary in binary_set:
-        effective_step = step_size % len(binary)
-        rotated = binary[effective_step:] + binary[:effective_step]
-        rotated_set.add(rotated)
+        rotated_set.add(rotate(binary, step_size, edo))
     return rotated_set
 
-def prepare_set_of_chords(set_of_chords, edo, all_unique_binaries, specific_chords, rotations, interval_variations):
-    # add all unique binaries of specific sizes
-    set_of_chords.update(unique_binaries(edo, all_unique_binaries))
-    # add specific chord shapes
-    for size, index in specific_chords:
-        set_of_chords.add(unique_binaries(edo, size)[index])
+def prepare_set_of_chords(set_of_chords, edo, all_unique_binaries, specific_chords, rotations, interval_variations,
+                          interval_depth=1, interval_exclude=None):
+    if rotations == None:
+        # whole sizes expand from their orbit tables, only the rest goes chord by chord
+        set_of_chords.update(necklace_unrank(index, edo, size) for size, index in specific_chords)
+        add_all_rotations_to_set(set_of_chords, edo)
+        if isinstance(all_unique_binaries, int):
+            all_unique_binaries = [all_unique_binaries]
+        elif all_unique_binaries is None:
+            all_unique_binaries = range(edo+1)
+        for size in set(all_unique_binaries):
+            set_of_chords.update(shape_rotations(edo, size).tolist())
+        rotations = [0]
+    else:
+        # add all unique binaries of specific sizes
+        set_of_chords.update(unique_binaries(edo, all_unique_binaries))
+        # add specific chord shapes
+        for size, index in specific_chords:
+            set_of_chords.add(necklace_unrank(index, edo, size))
     # rotate all chords in set by specific step sizes
     if isinstance(rotations, int):
         if rotations == 0:
             pass
-        set_of_chords = rotate_by_step(set_of_chords, rotations)
+        set_of_chords = rotate_by_step(set_of_chords, edo, rotations)
     elif rotations == [0]:
         pass
     elif rotations == []:
         set_of_chords = set()
     elif len(rotations) == 1:
-        set_of_chords = rotate_by_step(set_of_chords, rotations[0])
-    elif rotations == None:
-        add_all_rotations_to_set(set_of_chords)
+        set_of_chords = rotate_by_step(set_of_chords, edo, rotations[0])
     elif rotations:
         set_of_chords2 = set()
         for i in rotations:
-            set_of_chords2.update(rotate_by_step(set_of_chords, i))
+            set_of_chords2.update(rotate_by_step(set_of_chords, edo, i))
         set_of_chords = set_of_chords2
     # also add all interval variations of elements in list_of_chords
-    set_of_chords = add_all_interval_variations_to_set(set_of_chords, interval_variations, True)
+    if interval_variations and (interval_depth > 1 or interval_exclude):
+        chords = np.fromiter(set_of_chords, dtype=np.uint64, count=len(set_of_chords))
+        set_of_chords = set(interval_reach(chords, edo, interval_variations, interval_depth, interval_exclude).tolist())
+    else:
+        set_of_chords = add_all_interval_variations_to_set(set_of_chords, edo, interval_variations, True)
 
     return(set_of_chords)
 
+# chords per chunk in the streaming pipeline
+STREAM_CHUNK = 1 << 16
+# edos up to this drop repeated chords with a 2**edo bit table, above it with a set
+BITMAP_MAX_EDO = 30
+
+def rotate_array(chords, step, edo):
+    # step can also be an array with a step for every chord
+    full = np.uint64((1 << edo) - 1)
+    if np.ndim(step) == 0:
+        step %= edo
+        if step == 0:
+            return chords.copy()
+        return ((chords << step) | (chords >> (edo - step))) & full
+    step = np.asarray(step, dtype=np.uint64) % np.uint64(edo)
+    rotated = ((chords << step) | (chords >> (np.uint64(edo) - step))) & full
+    return np.where(step == 0, chords, rotated)
+
+def canonical_rotations(chords, edo, use_lookup=True):
+    # smallest_rotation for a whole array: the smallest rotations and the step each
+    # one was rotated by (the key character is CHARACTERS[(edo - step) % edo])
+    chords = np.asarray(chords, dtype=np.uint64)
+    lookup = canonical_lookup(edo) if use_lookup else None
+    if lookup is not None:
+        canonical, steps, _ = lookup
+        return canonical[chords].astype(np.uint64), steps[chords]
+    smallest = chords.copy()
+    steps = np.zeros(len(chords), dtype=np.uint8)
+    for step in range(1, edo):
+        rotated = rotate_array(chords, step, edo)
+        smaller = rotated < smallest
+        np.copyto(smallest, rotated, where=smaller)
+        steps[smaller] = step
+    return smallest, steps
+
+def rotation_periods(chords, edo):
+    # rotation_period for a whole array
+    chords = np.asarray(chords, dtype=np.uint64)
+    periods = np.full(len(chords), edo, dtype=np.uint8)
+    # largest divisor first, so the smallest period is the one that stays
+    for p in reversed(divisors(edo)[:-1]):
+        periods[rotate_array(chords, p, edo) == chords] = p
+    return periods
+
+def split_chunks(chunks, size):
+    for chunk in chunks:
+        for start in range(0, len(chunk), size):
+            yield chunk[start:start+size]
+
+def unique_chunks(chunks, edo):
+    # drops every chord that was already yielded
+    if edo <= BITMAP_MAX_EDO:
+        seen = np.zeros((1 << edo) // 8 + 1, dtype=np.uint8)
+        for chunk in chunks:
+            chunk = np.unique(chunk)
+            byte, bit = chunk >> 3, np.uint8(1) << (chunk & 7).astype(np.uint8)
+            new = seen[byte] & bit == 0
+            chunk, byte, bit = chunk[new], byte[new], bit[new]
+            np.bitwise_or.at(seen, byte, bit)
+            if len(chunk):
+                yield chunk
+    else:
+        seen = set()
+        for chunk in chunks:
+            new = [chord for chord in np.unique(chunk).tolist() if chord not in seen]
+            seen.update(new)
+            if new:
+                yield np.array(new, dtype=np.uint64)
+
+def shape_chunks(edo, all_unique_binaries, specific_chords):
+    if isinstance(all_unique_binaries, int):
+        all_unique_binaries = [all_unique_binaries]
+    elif all_unique_binaries is None:
+        all_unique_binaries = range(edo+1)
+    for size in sorted(set(all_unique_binaries)):
+        yield from split_chunks([necklace_table(edo, size)], STREAM_CHUNK)
+    if specific_chords:
+        yield np.array([necklace_unrank(index, edo, size) for size, index in specific_chords], dtype=np.uint64)
+
+def rotation_chunks(chunks, edo, rotations):
+    # same cases as prepare_set_of_chords: None is every rotation, [] is nothing
+    if isinstance(rotations, int):
+        rotations = [rotations]
+    elif rotations is None:
+        # every distinct rotation once: chords only go up to their period
+        for chunk in split_chunks(chunks, max(1, STREAM_CHUNK // edo)):
+            periods = rotation_periods(chunk, edo)
+            yield np.concatenate([rotate_array(chunk[periods > step], step, edo) for step in range(edo)])
+        return
+    if not rotations:
+        return
+    for chunk in split_chunks(chunks, max(1, STREAM_CHUNK // len(rotations))):
+        yield np.concatenate([rotate_array(chunk, step, edo) for step in rotations])
+
+def interval_variation_chunks(chunks, edo, intervals):
+    # generate_interval_variations in both directions, for a chunk at a time
+    if not intervals:
+        yield from chunks
+        return
+    if isinstance(intervals, int):
+        intervals = [intervals]
+    for chunk in split_chunks(chunks, max(1, STREAM_CHUNK // (2 * edo * len(intervals)))):
+        yield interval_variations_array(chunk, edo, intervals, True)
+
+def stream_chords(edo, all_unique_binaries, specific_chords, rotations, interval_variations,
+                  interval_depth=1, interval_exclude=None):
+    # the chords of prepare_set_of_chords as a stream of numpy chunks, every chord once.
+    # nothing but the dedupe bit tables grows with the intermediate stages.
+    chunks = shape_chunks(edo, all_unique_binaries, specific_chords)
+    chunks = unique_chunks(rotation_chunks(chunks, edo, rotations), edo)
+    if interval_variations and (interval_depth > 1 or interval_exclude):
+        # the search needs the whole starting set at once
+        chunks = list(chunks)
+        chords = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.uint64)
+        chunks = split_chunks([interval_reach(chords, edo, interval_variations, interval_depth, interval_exclude)], STREAM_CHUNK)
+    elif interval_variations:
+        chunks = unique_chunks(interval_variation_chunks(chunks, edo, interval_variations), edo)
+    return chunks
+
+def divisors(n):
+    return [d for d in range(1, n+1) if n % d == 0]
+
+def prime_factors(n):
+    factors = []
+    p = 2
+    while p * p <= n:
+        if n % p == 0:
+            factors.append(p)
+            while n % p == 0:
+                n //= p
+        p += 1
+    if n > 1:
+        factors.append(n)
+    return factors
+
+def euler_phi(n):
+    result = n
+    for p in prime_factors(n):
+        result -= result // p
+    return result
+
+def mobius(n):
+    factors = prime_factors(n)
+    for p in factors:
+        if n % (p * p) == 0:
+            return 0
+    return -1 if len(factors) % 2 else 1
+
+def lyndon_count(length, num_ones):
+    # aperiodic necklaces, by mobius inversion over the possible periods
+    if length == 0:
+        return 0
+    return sum(mobius(d) * comb(length // d, num_ones // d)
+               for d in divisors(gcd(length, num_ones))) // length
+
+def necklace_count(edo, chord_size, period=None):
+    # number of unique binaries of a chord size without generating them (burnside).
+    # with period given, only count the shapes whose smallest repeating unit is
+    # period steps long, i.e. the ones that have exactly period distinct rotations.
+    if not 0 <= chord_size <= edo:
+        return 0
+    if edo == 0:
+        return 1 if period is None else 0
+    if period is not None:
+        if period <= 0 or edo % period or (chord_size * period) % edo:
+            return 0
+        return lyndon_count(period, chord_size * period // edo)
+    return sum(euler_phi(d) * comb(edo // d, chord_size // d)
+               for d in divisors(gcd(edo, chord_size))) // edo
+
+def necklace_rank(binary, edo):
+    # index of the chord's shape among the unique binaries of its size, found by
+    # counting the shapes that sort before it rather than listing them.
+    # a word sorts its necklace before the shape when some rotation of it reads
+    # smaller than the shape. reading left to right, that is a small automaton:
+    # the state is how much of the shape the current rotation still matches, a
+    # 1 where the shape has a 0 drops back to 0 and a 0 where it has a 1 is a
+    # smaller rotation. words of length d that never hit a smaller rotation
+    # (repeated edo // d times) are the closed walks of length d, and mobius
+    # inversion over the periods turns word counts into shape counts.
+    lookup = canonical_lookup(edo)
+    if lookup is not None:
+        return int(lookup[2][binary])
+    necklace = smallest_rotation(binary, edo)[0]
+    k = bin(necklace).count('1')
+    if k == 0 or k == edo:
+        return 0
+    bits = [necklace >> (edo-1-i) & 1 for i in range(edo)]
+    ones = [0]
+    for bit in bits:
+        ones.append(ones[-1] + bit)
+    period = rotation_period(necklace, edo)
+    # walk counts are polynomials in the number of ones, packed into one int
+    slot = edo + 1
+    slot_mask = (1 << slot) - 1
+    below = {}
+    for d in divisors(edo):
+        if k * d % edo:
+            below[d] = 0
+            continue
+        num_ones = k * d // edo
+        limit = (1 << slot * (num_ones+1)) - 1
+        # walks[m]: walks of length m from state 0 back to state 0 that end with a drop
+        walks = [1] + [0] * d
+        for m in range(1, d+1):
+            total = 0
+            for length in range(m):
+                if not bits[length]:
+                    total += walks[m-length-1] << slot * (ones[length]+1)
+            walks[m] = total & limit
+        # closed walks that never drop just cycle through the shape's last period
+        closed = period if d % period == 0 and d // period * ones[period] == num_ones else 0
+        for length in range(d):
+            rest = num_ones - ones[length] - 1
+            if not bits[length] and rest >= 0:
+                closed += (length+1) * (walks[d-length-1] >> slot * rest & slot_mask)
+        below[d] = comb(d, num_ones) - closed
+    rank = 0
+    for d in divisors(edo):
+        rank += sum(mobius(d // e) * below[e] for e in divisors(d)) // d
+    return rank
+
+def necklace_unrank(index, edo, chord_size):
+    # the shape at unique_binaries(edo, chord_size)[index], built bit by bit from
+    # the top: keep a bit when the shapes before the first shape at or above the
+    # value still number at most index
+    count = necklace_count(edo, chord_size)
+    if index < 0:
+        index += count
+    if not 0 <= index < count:
+        raise IndexError("necklace index out of range")
+    binary = 0
+    for bit in reversed(range(edo)):
+        candidate = binary | 1 << bit
+        following = next(necklaces(edo, chord_size, candidate), None)
+        if following is not None and necklace_rank(following, edo) <= index:
+            binary = candidate
+    return binary
+
 def calculate_chord_counts(edo):
     chord_counts = {}
     for size in range(1, edo + 1):
-        chord_counts[size] = len(unique_binaries(edo, size))
+        chord_counts[size] = necklace_count(edo, size)
     return chord_counts
 
-def main():
-
-
-    FILTER_MODE = False
-    INVERT_FILTER = False
-    REDUCE_FINAL_SET = False
-
+def fifths_order(edo):
+    # pitch classes around the circle of fifths. when the fifth doesn't generate
+    # every pitch class, the circles through the remaining ones follow each other.
+    fifth = round(edo * log2(3/2)) % edo if edo else 0
+    circle = gcd(fifth, edo) or 1
+    return [(start + k * fifth) % edo for start in range(circle) for k in range(edo // circle)]
+
+def fifths_masks(chords, edo):
+    # bit k of the result is the k-th pitch class around the circle of fifths
+    fifths = np.zeros(len(chords), dtype=np.uint64)
+    for k, pitch in enumerate(fifths_order(edo)):
+        fifths |= (chords >> np.uint64(pitch) & np.uint64(1)) << np.uint64(k)
+    return fifths
+
+def gray_ranks(chords):
+    # position of each chord in the binary reflected gray code
+    ranks = chords.copy()
+    for shift in (1, 2, 4, 8, 16, 32):
+        ranks ^= ranks >> np.uint64(shift)
+    return ranks
+
+# sort keys of the orderings, most significant first. every ordering ends with the
+# chord itself so equal keys keep binary order. add an entry to add an ordering.
+ORDERINGS = {
+    'binary': lambda chords, edo: [chords],
+    'popcount': lambda chords, edo: [popcounts(chords), chords],
+    'gray': lambda chords, edo: [gray_ranks(chords)],
+    'fifths': lambda chords, edo: [fifths_masks(chords, edo), chords],
+    'fifths gray': lambda chords, edo: [gray_ranks(fifths_masks(chords, edo)), chords],
+    'shape': lambda chords, edo: [canonical_rotations(chords, edo)[0], chords],
+}
+
+def ordering_permutation(chords, edo, ordering='binary', cache=None):
+    # indices that put chords in the given ordering. with a cache dict (one per
+    # result set) every ordering is only computed once.
+    if cache is not None and ordering in cache:
+        return cache[ordering]
+    chords = np.asarray(chords, dtype=np.uint64)
+    keys = ORDERINGS[ordering](chords, edo)
+    permutation = np.argsort(keys[0], kind='stable') if len(keys) == 1 else np.lexsort(keys[::-1])
+    if cache is not None:
+        cache[ordering] = permutation
+    return permutation
+
+def order_chords(chords, edo, ordering='binary'):
+    chords = np.asarray(chords, dtype=np.uint64)
+    return chords[ordering_permutation(chords, edo, ordering)]
+
+# settings keys that the selector doesn't set
+DEFAULT_SETTINGS = {
+    "FILTER_MODE": False,
+    "INVERT_FILTER": False,
+    "REDUCE_FINAL_SET": False,
+    "STREAMING": False,
+    # a key of ORDERINGS
+    "ORDERING": 'binary',
+    # interval moves in a row, and chords the moves may not pass through
+    "INTERVAL_DEPTH1": 1,
+    "INTERVAL_DEPTH2": 1,
+    "INTERVAL_EXCLUDE1": [],
+    "INTERVAL_EXCLUDE2": [],
+}
+
+def generate_chords(settings):
+    # settings holds the same names as settings.py, returns the final chords in ORDERING order
+    settings = {**DEFAULT_SETTINGS, **settings}
+    if settings["STREAMING"]:
+        return generate_chords_streaming(settings)
+    edo = settings["EDO"]
 
     set_of_chords = set()
-    set_of_chords = prepare_set_of_chords(set_of_chords, EDO, ALL_UNIQUE_BINARIES1, SPECIFIC_CHORDS1, ROTATIONS1, INTERVAL_VARIATIONS1)
+    set_of_chords = prepare_set_of_chords(set_of_chords, edo, settings["ALL_UNIQUE_BINARIES1"], settings["SPECIFIC_CHORDS1"],
+                                          settings["ROTATIONS1"], settings["INTERVAL_VARIATIONS1"],
+                                          settings["INTERVAL_DEPTH1"], settings["INTERVAL_EXCLUDE1"])
 
     anti_set_of_chords = set()
-    anti_set_of_chords = prepare_set_of_chords(anti_set_of_chords, EDO, ALL_UNIQUE_BINARIES2, SPECIFIC_CHORDS2, ROTATIONS2, INTERVAL_VARIATIONS2)
+    anti_set_of_chords = prepare_set_of_chords(anti_set_of_chords, edo, settings["ALL_UNIQUE_BINARIES2"], settings["SPECIFIC_CHORDS2"],
+                                               settings["ROTATIONS2"], settings["INTERVAL_VARIATIONS2"],
+                                               settings["INTERVAL_DEPTH2"], settings["INTERVAL_EXCLUDE2"])
 
-    if INVERT_FILTER:
+    if settings["INVERT_FILTER"]:
         A = set_of_chords
-        B = filter_chords(set_of_chords, anti_set_of_chords, FILTER_MODE)
+        B = filter_chords(set_of_chords, anti_set_of_chords, settings["FILTER_MODE"])
         final_set_of_chords = A - B if A != B else A
     else:
-        final_set_of_chords = filter_chords(set_of_chords, anti_set_of_chords, FILTER_MODE)
+        final_set_of_chords = filter_chords(set_of_chords, anti_set_of_chords, settings["FILTER_MODE"])
 
-    if REDUCE_FINAL_SET:
-        final_chords = set()
-        for i in final_set_of_chords:
-            binary, _ = smallest_rotation(i)
-            final_chords.add(binary)
+    if settings["REDUCE_FINAL_SET"]:
+        final_chords = np.fromiter(final_set_of_chords, dtype=np.uint64, count=len(final_set_of_chords))
+        final_chords = set(canonical_rotations(final_chords, edo)[0].tolist())
     else:
         final_chords = final_set_of_chords
 
-    try:
-        symbols = generate_symbols(final_chords, style='actual')
-        with open("symbols.py", "w") as f:
-            f.write(f"SYMBOLS = {symbols}\n")
-    except:
-        print('None')
+    if settings["ORDERING"] != 'binary':
+        return order_chords(sorted(final_chords), edo, settings["ORDERING"]).tolist()
+    return sorted(final_chords)
+
+def generate_chords_streaming(settings):
+    # same result as generate_chords as a sorted numpy array, built from chunks
+    settings = {**DEFAULT_SETTINGS, **settings}
+    edo = settings["EDO"]
+    def include_chunks():
+        return stream_chords(edo, settings["ALL_UNIQUE_BINARIES1"], settings["SPECIFIC_CHORDS1"],
+                             settings["ROTATIONS1"], settings["INTERVAL_VARIATIONS1"],
+                             settings["INTERVAL_DEPTH1"], settings["INTERVAL_EXCLUDE1"])
+    anti_chords = list(stream_chords(edo, settings["ALL_UNIQUE_BINARIES2"], settings["SPECIFIC_CHORDS2"],
+                                     settings["ROTATIONS2"], settings["INTERVAL_VARIATIONS2"],
+                                     settings["INTERVAL_DEPTH2"], settings["INTERVAL_EXCLUDE2"]))
+    anti_chords = np.concatenate(anti_chords) if anti_chords else np.zeros(0, dtype=np.uint64)
+    keep = chord_filter(anti_chords, edo, settings["FILTER_MODE"])
+
+    final_chunks = []
+    rejected = 0
+    for chunk in include_chunks():
+        passed = keep(chunk)
+        rejected += len(chunk) - np.count_nonzero(passed)
+        final_chunks.append(chunk[~passed] if settings["INVERT_FILTER"] else chunk[passed])
+    if settings["INVERT_FILTER"] and not rejected:
+        # like A - B if A != B else A
+        final_chunks = list(include_chunks())
+
+    if settings["REDUCE_FINAL_SET"]:
+        final_chunks = list(unique_chunks((canonical_rotations(chunk, edo)[0] for chunk in final_chunks), edo))
+
+    if not final_chunks:
+        return np.zeros(0, dtype=np.uint64)
+    return order_chords(np.sort(np.concatenate(final_chunks)), edo, settings["ORDERING"])
+
+def main():
+    import settings as settings_module
+    settings = {key: value for key, value in vars(settings_module).items() if key.isupper()}
+    # the batch run builds the canonical lookup of its edo once, later runs map it
+    from chord_cache import prepare_canonical_lookup
+    prepare_canonical_lookup(settings["EDO"])
+    final_chords = generate_chords(settings)
+
+    # masks only, symbols are made from them when shown or exported
+    from chord_results import RESULTS_FILE, write_results
+    final_chords = np.asarray(final_chords, dtype=np.uint64)
+    write_results(RESULTS_FILE, settings["EDO"], split_chunks([final_chords], STREAM_CHUNK), style='actual')
 
 if __name__ == '__main__':
     main()
 
 r'''
 TODO:
-  multiinterval transformations
+X multiinterval transformations
 
 X rotate one chord to all keys
 X rotate all chords to all keys
@@ -285,7 +986,7 @@ X rotate all chords to all keys
 
   filter chord transformations
   
-  turn the sorting into a function
+X turn the sorting into a function
 
 '''
 